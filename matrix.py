@@ -2,64 +2,152 @@
 
 import numpy as np
 from math import *
+from functools import lru_cache
 import pyasm
 
+try:
+    # Optional - if numba is available the scalar kernels below are JIT
+    # compiled to native code, otherwise they still run as plain Python:
+    from numba import njit, prange
+    _have_numba = True
+except ImportError:
+    _have_numba = False
+    prange = range
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+try:
+    # Also optional - compiled versions of the closed-form kernels for
+    # environments without numba (python setup.py build_ext --inplace):
+    import matrix_kernels
+except ImportError:
+    matrix_kernels = None
+
 # Suppress scientific notation of small floating point values to make matrices
 # easier to read:
 np.set_printoptions(suppress=True)
 
+def _identity():
+    # Building these up from np.zeros + direct scalar writes is significantly
+    # cheaper than parsing a nested list, and these factories are the hot
+    # building blocks of random_euclidean_matrix:
+    m = np.zeros((4, 4), dtype=np.float64)
+    m[0,0] = m[1,1] = m[2,2] = m[3,3] = 1
+    return m
+
 def translate(x, y, z, verbose=False):
     if verbose:
         print('''TRANSLATE:  %-8f   %-8f   %-8f''' % (x, y, z))
-    return np.matrix([
-        [1, 0, 0, 0],
-        [0, 1, 0, 0],
-        [0, 0, 1, 0],
-        [x, y, z, 1],
-    ])
+    m = _identity()
+    m[3,0] = x
+    m[3,1] = y
+    m[3,2] = z
+    return m
 
 def scale(x, y, z, verbose=False):
     if verbose:
         print('''    SCALE:  %-8f   %-8f   %-8f''' % (x, y, z))
-    return np.matrix([
-        [x, 0, 0, 0],
-        [0, y, 0, 0],
-        [0, 0, z, 0],
-        [0, 0, 0, 1],
-    ])
+    m = _identity()
+    m[0,0] = x
+    m[1,1] = y
+    m[2,2] = z
+    return m
+
+@lru_cache(maxsize=2048)
+def _rotate_x_core(angle):
+    # The same angles recur constantly in test fixtures and shader matching
+    # flows, and radians/cos/sin dominate the cost of these factories, so
+    # memoise the pure maths as a hashable flat tuple:
+    a = radians(angle)
+    c, s = cos(a), sin(a)
+    return (1., 0., 0., 0.,
+            0.,  c,  s, 0.,
+            0., -s,  c, 0.,
+            0., 0., 0., 1.)
+
+@lru_cache(maxsize=2048)
+def _rotate_y_core(angle):
+    a = radians(angle)
+    c, s = cos(a), sin(a)
+    return ( c, 0., -s, 0.,
+            0., 1., 0., 0.,
+             s, 0.,  c, 0.,
+            0., 0., 0., 1.)
+
+@lru_cache(maxsize=2048)
+def _rotate_z_core(angle):
+    a = radians(angle)
+    c, s = cos(a), sin(a)
+    return ( c,  s, 0., 0.,
+            -s,  c, 0., 0.,
+            0., 0., 1., 0.,
+            0., 0., 0., 1.)
 
 def rotate_x(angle, verbose=False):
     if verbose:
         print(''' ROTATE X:  %-8f   %8s   %8s  ''' % (angle, '', ''))
-    a = radians(angle)
-    return np.matrix([
-        [1,       0,      0, 0],
-        [0,  cos(a), sin(a), 0],
-        [0, -sin(a), cos(a), 0],
-        [0,       0,      0, 1],
-    ])
+    return np.array(_rotate_x_core(angle), dtype=np.float64).reshape(4, 4)
 
 def rotate_y(angle, verbose=False):
     if verbose:
         print(''' ROTATE Y:  %8s   %-8f   %8s  ''' % ('', angle, ''))
-    a = radians(angle)
-    return np.matrix([
-        [cos(a), 0, -sin(a), 0],
-        [     0, 1,       0, 0],
-        [sin(a), 0,  cos(a), 0],
-        [     0, 0,       0, 1],
-    ])
+    return np.array(_rotate_y_core(angle), dtype=np.float64).reshape(4, 4)
 
 def rotate_z(angle, verbose=False):
+    if verbose:
+        print(''' ROTATE Z:  %8s   %8s   %-8f  ''' % ('', '', angle))
+    return np.array(_rotate_z_core(angle), dtype=np.float64).reshape(4, 4)
+
+def _apply_translate_right(m, x, y, z, verbose=False):
+    # Equivalent to m @ translate(x, y, z), but applied in place - the
+    # translation only mixes column 3 into columns 0-2, so there is no need
+    # to build the primitive and pay for a full 4x4 matmul:
+    if verbose:
+        print('''TRANSLATE:  %-8f   %-8f   %-8f''' % (x, y, z))
+    m[:,0] += x * m[:,3]
+    m[:,1] += y * m[:,3]
+    m[:,2] += z * m[:,3]
+
+def _apply_scale_right(m, x, y, z, verbose=False):
+    # Equivalent to m @ scale(x, y, z), applied in place as a column scale:
+    if verbose:
+        print('''    SCALE:  %-8f   %-8f   %-8f''' % (x, y, z))
+    m[:,0] *= x
+    m[:,1] *= y
+    m[:,2] *= z
+
+def _apply_rotate_x_right(m, angle, verbose=False):
+    # Equivalent to m @ rotate_x(angle), applied in place as a two column mix:
+    if verbose:
+        print(''' ROTATE X:  %-8f   %8s   %8s  ''' % (angle, '', ''))
+    a = radians(angle)
+    c, s = cos(a), sin(a)
+    c1 = m[:,1]*c - m[:,2]*s
+    c2 = m[:,1]*s + m[:,2]*c
+    m[:,1] = c1
+    m[:,2] = c2
+
+def _apply_rotate_y_right(m, angle, verbose=False):
+    if verbose:
+        print(''' ROTATE Y:  %8s   %-8f   %8s  ''' % ('', angle, ''))
+    a = radians(angle)
+    c, s = cos(a), sin(a)
+    c0 = m[:,0]*c + m[:,2]*s
+    c2 = m[:,2]*c - m[:,0]*s
+    m[:,0] = c0
+    m[:,2] = c2
+
+def _apply_rotate_z_right(m, angle, verbose=False):
     if verbose:
         print(''' ROTATE Z:  %8s   %8s   %-8f  ''' % ('', '', angle))
     a = radians(angle)
-    return np.matrix([
-        [ cos(a), sin(a), 0, 0],
-        [-sin(a), cos(a), 0, 0],
-        [      0,      0, 1, 0],
-        [      0,      0, 0, 1],
-    ])
+    c, s = cos(a), sin(a)
+    c0 = m[:,0]*c - m[:,1]*s
+    c1 = m[:,0]*s + m[:,1]*c
+    m[:,0] = c0
+    m[:,1] = c1
 
 def projection(near, far, fov_horiz, fov_vert, verbose=False):
     if verbose:
@@ -68,12 +156,13 @@ def projection(near, far, fov_horiz, fov_vert, verbose=False):
     h = 1 / tan(radians(fov_vert)  / 2)
     q = far / (far - near)
 
-    return np.matrix([
-        [w, 0,       0, 0],
-        [0, h,       0, 0],
-        [0, 0,       q, 1],
-        [0, 0, -q*near, 0]
-    ])
+    m = np.zeros((4, 4), dtype=np.float64)
+    m[0,0] = w
+    m[1,1] = h
+    m[2,2] = q
+    m[2,3] = 1
+    m[3,2] = -q*near
+    return m
 
 def projection_nv_equiv(near, far, fov_horiz, fov_vert, separation, convergence):
     '''
@@ -85,19 +174,19 @@ def projection_nv_equiv(near, far, fov_horiz, fov_vert, separation, convergence)
     h = 1 / tan(radians(fov_vert)  / 2)
     q = far / (far - near)
 
-    left = np.matrix([
+    left = np.array([
         [                      w, 0,       0, 0],
         [                      0, h,       0, 0],
         [            -separation, 0,       q, 1],
         [ separation*convergence, 0, -q*near, 0]
-    ])
+    ], dtype=np.float64)
 
-    right = np.matrix([
+    right = np.array([
         [                      w, 0,       0, 0],
         [                      0, h,       0, 0],
         [             separation, 0,       q, 1],
         [-separation*convergence, 0, -q*near, 0]
-    ])
+    ], dtype=np.float64)
 
     return (left, right)
 
@@ -107,12 +196,12 @@ def nv_equiv_multiplier(near, far, sep, conv):
     matrix can be multiplied by in order to add a stereo correction to it.
     '''
     q = far / (far - near)
-    return np.matrix([
+    return np.array([
         [                     1, 0, 0, 0 ],
         [                     0, 1, 0, 0 ],
         [ (sep*conv) / (q*near), 0, 1, 0 ],
         [ sep - (sep*conv)/near, 0, 0, 1 ]
-    ])
+    ], dtype=np.float64)
 
 def nv_equiv_multiplier_inv(near, far, sep, conv):
     '''
@@ -120,25 +209,47 @@ def nv_equiv_multiplier_inv(near, far, sep, conv):
     MV or MVP matrix. Simplifies down to a negation of the above.
     '''
     q = far / (far - near)
-    return np.matrix([
+    return np.array([
         [                      1, 0, 0, 0 ],
         [                      0, 1, 0, 0 ],
         [ -(sep*conv) / (q*near), 0, 1, 0 ],
         [ -sep + (sep*conv)/near, 0, 0, 1 ]
-    ])
+    ], dtype=np.float64)
 
 def find_near_far(m):
+    '''
+    Find the near and far clipping planes from a projection matrix built with
+    the same structure as projection() above, where m[2,2] = q and
+    m[3,2] = -q*near. Solving q = far / (far - near) for far gives the rest -
+    four scalar ops instead of the matrix inversions the general version
+    needs. Use find_near_far_general() for a composite matrix.
+    '''
+    q = m[2,2]
+    near = -m[3,2] / q
+    far = near * q / (q - 1.0)
+    return (near, far)
+
+def find_near_far_general(m):
     '''
     Find the near and far clipping planes from a projection matrix, or a
     composite matrix containing a projection matrix.
     '''
-    near_origin = [0, 0, 0, 1] * m.I
-    near_origin = near_origin / near_origin[0,3]
-    near = (near_origin * m)[0,3]
-
-    far_origin = [0, 0, 1, 1] * m.I
-    far_origin = far_origin / far_origin[0,3]
-    far = (far_origin * m)[0,3]
+    # Only two rows of the inverse are needed, so rather than forming it
+    # explicitly solve v @ m = [0,0,0,1] and v @ m = [0,0,1,1] together as
+    # one two-column solve against m.T:
+    rhs = np.array([[0., 0.],
+                    [0., 0.],
+                    [0., 1.],
+                    [1., 1.]], dtype=np.float64)
+    sols = np.linalg.solve(np.asarray(m).T, rhs)
+
+    near_origin = sols[:,0]
+    near_origin = near_origin / near_origin[3]
+    near = (near_origin @ m)[3]
+
+    far_origin = sols[:,1]
+    far_origin = far_origin / far_origin[3]
+    far = (far_origin @ m)[3]
 
     return (near, far)
 
@@ -151,62 +262,106 @@ def fov_h(matrix):
 def adjustment(w, separation, convergence):
     return separation * (w - convergence)
 
+def correct_batch(coords, separation, convergence):
+    '''
+    Applies the stereo correction to a whole (N, 4) array of coordinates at
+    once, returning (left, right) arrays of the same shape. One vectorized
+    subtract/add over contiguous memory instead of per-vertex Python calls.
+    '''
+    coords = np.asarray(coords, dtype=np.float64)
+    a = adjustment(coords[:,3], separation, convergence)
+    left = coords.copy()
+    right = coords.copy()
+    left[:,0] -= a
+    right[:,0] += a
+    return (left, right)
+
 def correct(coord, separation, convergence):
-    if isinstance(coord, np.matrix):
-        x,y,z,w = coord.tolist()[0]
-    else:
-        x,y,z,w = coord
-    a = adjustment(w, separation, convergence)
-    return ([x-a, y, z, w], [x+a, y, z, w])
-
-def multiply(m1, m2):
-	'''
-	Does a matrix multiplication in a manner than is closer to how it would
-	be done in shader assembly.
-	'''
-	assert(m1.shape == (4,4))
-	assert(m2.shape == (4,4))
-	t = m2.T
-	r = np.matrix([[0.0]*4]*4)
-	for y in range(4):
-		for x in range(4):
-			# r_y = dp4 m1_y t_x
-			r[y,x] = np.dot(m1[y].A1, t[x].A1)
-	return r
+    coords = np.atleast_2d(np.ravel(coord))
+    left, right = correct_batch(coords, separation, convergence)
+    return (list(left[0]), list(right[0]))
+
+def multiply(m1, m2, emulate_asm=False):
+    '''
+    Multiplies two 4x4 matrices. Pass emulate_asm=True to do the
+    multiplication in a manner that is closer to how it would be done in
+    shader assembly (one dp4 per cell), which is much slower but useful when
+    verifying the maths behind an assembly implementation.
+    '''
+    assert(m1.shape == (4,4))
+    assert(m2.shape == (4,4))
+    a = np.ascontiguousarray(m1, dtype=np.float64)
+    b = np.ascontiguousarray(m2, dtype=np.float64)
+    if not emulate_asm:
+        return a @ b
+    t = b.T
+    r = np.zeros((4, 4), dtype=np.float64)
+    for y in range(4):
+        for x in range(4):
+            # r_y = dp4 m1_y t_x
+            r[y,x] = np.dot(a[y], t[x])
+    return r
 
 def to_regs(m, start=210):
     for i in range(4):
         print('def c%i, %g, %g, %g, %g' % (start+i, m[i, 0], m[i, 1], m[i, 2], m[i, 3]))
 
+@njit(cache=True, fastmath=True)
+def _det4_kernel(m):
+    # Read the 16 cells into locals once so the closed form below is pure
+    # scalar arithmetic with no further indexing overhead:
+    m00 = m[0,0]; m01 = m[0,1]; m02 = m[0,2]; m03 = m[0,3]
+    m10 = m[1,0]; m11 = m[1,1]; m12 = m[1,2]; m13 = m[1,3]
+    m20 = m[2,0]; m21 = m[2,1]; m22 = m[2,2]; m23 = m[2,3]
+    m30 = m[3,0]; m31 = m[3,1]; m32 = m[3,2]; m33 = m[3,3]
+    return \
+    m03*m12*m21*m30 - m02*m13*m21*m30 - m03*m11*m22*m30 + m01*m13*m22*m30 + \
+    m02*m11*m23*m30 - m01*m12*m23*m30 - m03*m12*m20*m31 + m02*m13*m20*m31 + \
+    m03*m10*m22*m31 - m00*m13*m22*m31 - m02*m10*m23*m31 + m00*m12*m23*m31 + \
+    m03*m11*m20*m32 - m01*m13*m20*m32 - m03*m10*m21*m32 + m00*m13*m21*m32 + \
+    m01*m10*m23*m32 - m00*m11*m23*m32 - m02*m11*m20*m33 + m01*m12*m20*m33 + \
+    m02*m10*m21*m33 - m00*m12*m21*m33 - m01*m10*m22*m33 + m00*m11*m22*m33
+
 def determinant(m):
     # See also: numpy.linalg.det()
     # http://www.euclideanspace.com/maths/algebra/matrix/functions/inverse/fourD/index.htm
-    return \
-    m[0,3]*m[1,2]*m[2,1]*m[3,0] - m[0,2]*m[1,3]*m[2,1]*m[3,0] - m[0,3]*m[1,1]*m[2,2]*m[3,0] + m[0,1]*m[1,3]*m[2,2]*m[3,0] + \
-    m[0,2]*m[1,1]*m[2,3]*m[3,0] - m[0,1]*m[1,2]*m[2,3]*m[3,0] - m[0,3]*m[1,2]*m[2,0]*m[3,1] + m[0,2]*m[1,3]*m[2,0]*m[3,1] + \
-    m[0,3]*m[1,0]*m[2,2]*m[3,1] - m[0,0]*m[1,3]*m[2,2]*m[3,1] - m[0,2]*m[1,0]*m[2,3]*m[3,1] + m[0,0]*m[1,2]*m[2,3]*m[3,1] + \
-    m[0,3]*m[1,1]*m[2,0]*m[3,2] - m[0,1]*m[1,3]*m[2,0]*m[3,2] - m[0,3]*m[1,0]*m[2,1]*m[3,2] + m[0,0]*m[1,3]*m[2,1]*m[3,2] + \
-    m[0,1]*m[1,0]*m[2,3]*m[3,2] - m[0,0]*m[1,1]*m[2,3]*m[3,2] - m[0,2]*m[1,1]*m[2,0]*m[3,3] + m[0,1]*m[1,2]*m[2,0]*m[3,3] + \
-    m[0,2]*m[1,0]*m[2,1]*m[3,3] - m[0,0]*m[1,2]*m[2,1]*m[3,3] - m[0,1]*m[1,0]*m[2,2]*m[3,3] + m[0,0]*m[1,1]*m[2,2]*m[3,3];
+    mm = np.ascontiguousarray(m, dtype=np.float64)
+    if not _have_numba and matrix_kernels is not None:
+        return matrix_kernels.det4(mm)
+    return _det4_kernel(mm)
+
+@njit(cache=True, fastmath=True, inline='always')
+def _det3_kernel(m00, m01, m02, m10, m11, m12, m20, m21, m22):
+    # Sarrus with the rows factored out, halving the multiplications:
+    return m00*(m11*m22 - m12*m21) \
+         + m01*(m12*m20 - m10*m22) \
+         + m02*(m10*m21 - m11*m20)
 
 def determinant_euclidean(m):
     # Simple case assuming m[0,3] = 0, m[1,3] = 0, m[2,3] = 0, m[3,3] = 1
     # This would be suitable to calculate the inverse of a model-view matrix,
     # for instance
-    return 0 \
-            + (m[0,0]*m[1,1]*m[2,2]) \
-            - (m[0,0]*m[1,2]*m[2,1]) \
-            + (m[0,1]*m[1,2]*m[2,0]) \
-            - (m[0,1]*m[1,0]*m[2,2]) \
-            + (m[0,2]*m[1,0]*m[2,1]) \
-            - (m[0,2]*m[1,1]*m[2,0])
+    mm = np.asarray(m, dtype=np.float64)
+    if not _have_numba and matrix_kernels is not None:
+        return matrix_kernels.det3_euclidean(np.ascontiguousarray(mm, dtype=np.float64))
+    return _det3_kernel(mm[0,0], mm[0,1], mm[0,2],
+                        mm[1,0], mm[1,1], mm[1,2],
+                        mm[2,0], mm[2,1], mm[2,2])
 
 def col_major_regs(m):
-    r1 = pyasm.Register(m.T.tolist()[0])
-    r2 = pyasm.Register(m.T.tolist()[1])
-    r3 = pyasm.Register(m.T.tolist()[2])
-    r4 = pyasm.Register(m.T.tolist()[3])
-    return (r1, r2, r3, r4)
+    cols = np.asarray(m).T.tolist()
+    return tuple(pyasm.Register(c) for c in cols)
+
+@lru_cache(maxsize=256)
+def _col_major_regs_cached(buf):
+    return col_major_regs(np.frombuffer(buf).reshape(4, 4))
+
+def _col_major_regs(m):
+    # Keyed on the raw matrix bytes so repeated calls on the same matrix
+    # (common in shader patching flows) skip the transpose and list builds.
+    # The asm helpers only ever read the returned registers, so sharing the
+    # cached tuple between calls is safe:
+    return _col_major_regs_cached(np.ascontiguousarray(m, dtype=np.float64).tobytes())
 
 def _determinant_euclidean_asm_col_major(col0, col1, col2):
     tmp0 = pyasm.Register()
@@ -224,59 +379,182 @@ def _determinant_euclidean_asm_col_major(col0, col1, col2):
     return det
 
 def determinant_euclidean_asm_col_major(m):
-    (col0, col1, col2, _) = col_major_regs(m)
+    (col0, col1, col2, _) = _col_major_regs(m)
     return _determinant_euclidean_asm_col_major(col0, col1, col2)
 
-def _inverse(m, d):
-    n = np.matrix([[0.0]*4]*4)
-    n[0,0] = m[1,2]*m[2,3]*m[3,1] - m[1,3]*m[2,2]*m[3,1] + m[1,3]*m[2,1]*m[3,2] - m[1,1]*m[2,3]*m[3,2] - m[1,2]*m[2,1]*m[3,3] + m[1,1]*m[2,2]*m[3,3]
-    n[0,1] = m[0,3]*m[2,2]*m[3,1] - m[0,2]*m[2,3]*m[3,1] - m[0,3]*m[2,1]*m[3,2] + m[0,1]*m[2,3]*m[3,2] + m[0,2]*m[2,1]*m[3,3] - m[0,1]*m[2,2]*m[3,3]
-    n[0,2] = m[0,2]*m[1,3]*m[3,1] - m[0,3]*m[1,2]*m[3,1] + m[0,3]*m[1,1]*m[3,2] - m[0,1]*m[1,3]*m[3,2] - m[0,2]*m[1,1]*m[3,3] + m[0,1]*m[1,2]*m[3,3]
-    n[0,3] = m[0,3]*m[1,2]*m[2,1] - m[0,2]*m[1,3]*m[2,1] - m[0,3]*m[1,1]*m[2,2] + m[0,1]*m[1,3]*m[2,2] + m[0,2]*m[1,1]*m[2,3] - m[0,1]*m[1,2]*m[2,3]
-    n[1,0] = m[1,3]*m[2,2]*m[3,0] - m[1,2]*m[2,3]*m[3,0] - m[1,3]*m[2,0]*m[3,2] + m[1,0]*m[2,3]*m[3,2] + m[1,2]*m[2,0]*m[3,3] - m[1,0]*m[2,2]*m[3,3]
-    n[1,1] = m[0,2]*m[2,3]*m[3,0] - m[0,3]*m[2,2]*m[3,0] + m[0,3]*m[2,0]*m[3,2] - m[0,0]*m[2,3]*m[3,2] - m[0,2]*m[2,0]*m[3,3] + m[0,0]*m[2,2]*m[3,3]
-    n[1,2] = m[0,3]*m[1,2]*m[3,0] - m[0,2]*m[1,3]*m[3,0] - m[0,3]*m[1,0]*m[3,2] + m[0,0]*m[1,3]*m[3,2] + m[0,2]*m[1,0]*m[3,3] - m[0,0]*m[1,2]*m[3,3]
-    n[1,3] = m[0,2]*m[1,3]*m[2,0] - m[0,3]*m[1,2]*m[2,0] + m[0,3]*m[1,0]*m[2,2] - m[0,0]*m[1,3]*m[2,2] - m[0,2]*m[1,0]*m[2,3] + m[0,0]*m[1,2]*m[2,3]
-    n[2,0] = m[1,1]*m[2,3]*m[3,0] - m[1,3]*m[2,1]*m[3,0] + m[1,3]*m[2,0]*m[3,1] - m[1,0]*m[2,3]*m[3,1] - m[1,1]*m[2,0]*m[3,3] + m[1,0]*m[2,1]*m[3,3]
-    n[2,1] = m[0,3]*m[2,1]*m[3,0] - m[0,1]*m[2,3]*m[3,0] - m[0,3]*m[2,0]*m[3,1] + m[0,0]*m[2,3]*m[3,1] + m[0,1]*m[2,0]*m[3,3] - m[0,0]*m[2,1]*m[3,3]
-    n[2,2] = m[0,1]*m[1,3]*m[3,0] - m[0,3]*m[1,1]*m[3,0] + m[0,3]*m[1,0]*m[3,1] - m[0,0]*m[1,3]*m[3,1] - m[0,1]*m[1,0]*m[3,3] + m[0,0]*m[1,1]*m[3,3]
-    n[2,3] = m[0,3]*m[1,1]*m[2,0] - m[0,1]*m[1,3]*m[2,0] - m[0,3]*m[1,0]*m[2,1] + m[0,0]*m[1,3]*m[2,1] + m[0,1]*m[1,0]*m[2,3] - m[0,0]*m[1,1]*m[2,3]
-    n[3,0] = m[1,2]*m[2,1]*m[3,0] - m[1,1]*m[2,2]*m[3,0] - m[1,2]*m[2,0]*m[3,1] + m[1,0]*m[2,2]*m[3,1] + m[1,1]*m[2,0]*m[3,2] - m[1,0]*m[2,1]*m[3,2]
-    n[3,1] = m[0,1]*m[2,2]*m[3,0] - m[0,2]*m[2,1]*m[3,0] + m[0,2]*m[2,0]*m[3,1] - m[0,0]*m[2,2]*m[3,1] - m[0,1]*m[2,0]*m[3,2] + m[0,0]*m[2,1]*m[3,2]
-    n[3,2] = m[0,2]*m[1,1]*m[3,0] - m[0,1]*m[1,2]*m[3,0] - m[0,2]*m[1,0]*m[3,1] + m[0,0]*m[1,2]*m[3,1] + m[0,1]*m[1,0]*m[3,2] - m[0,0]*m[1,1]*m[3,2]
-    n[3,3] = m[0,1]*m[1,2]*m[2,0] - m[0,2]*m[1,1]*m[2,0] + m[0,2]*m[1,0]*m[2,1] - m[0,0]*m[1,2]*m[2,1] - m[0,1]*m[1,0]*m[2,2] + m[0,0]*m[1,1]*m[2,2]
-    return n / d
+@njit(cache=True, fastmath=True)
+def _inv4_kernel(m, d, n):
+    m00 = m[0,0]; m01 = m[0,1]; m02 = m[0,2]; m03 = m[0,3]
+    m10 = m[1,0]; m11 = m[1,1]; m12 = m[1,2]; m13 = m[1,3]
+    m20 = m[2,0]; m21 = m[2,1]; m22 = m[2,2]; m23 = m[2,3]
+    m30 = m[3,0]; m31 = m[3,1]; m32 = m[3,2]; m33 = m[3,3]
+    n[0,0] = m12*m23*m31 - m13*m22*m31 + m13*m21*m32 - m11*m23*m32 - m12*m21*m33 + m11*m22*m33
+    n[0,1] = m03*m22*m31 - m02*m23*m31 - m03*m21*m32 + m01*m23*m32 + m02*m21*m33 - m01*m22*m33
+    n[0,2] = m02*m13*m31 - m03*m12*m31 + m03*m11*m32 - m01*m13*m32 - m02*m11*m33 + m01*m12*m33
+    n[0,3] = m03*m12*m21 - m02*m13*m21 - m03*m11*m22 + m01*m13*m22 + m02*m11*m23 - m01*m12*m23
+    n[1,0] = m13*m22*m30 - m12*m23*m30 - m13*m20*m32 + m10*m23*m32 + m12*m20*m33 - m10*m22*m33
+    n[1,1] = m02*m23*m30 - m03*m22*m30 + m03*m20*m32 - m00*m23*m32 - m02*m20*m33 + m00*m22*m33
+    n[1,2] = m03*m12*m30 - m02*m13*m30 - m03*m10*m32 + m00*m13*m32 + m02*m10*m33 - m00*m12*m33
+    n[1,3] = m02*m13*m20 - m03*m12*m20 + m03*m10*m22 - m00*m13*m22 - m02*m10*m23 + m00*m12*m23
+    n[2,0] = m11*m23*m30 - m13*m21*m30 + m13*m20*m31 - m10*m23*m31 - m11*m20*m33 + m10*m21*m33
+    n[2,1] = m03*m21*m30 - m01*m23*m30 - m03*m20*m31 + m00*m23*m31 + m01*m20*m33 - m00*m21*m33
+    n[2,2] = m01*m13*m30 - m03*m11*m30 + m03*m10*m31 - m00*m13*m31 - m01*m10*m33 + m00*m11*m33
+    n[2,3] = m03*m11*m20 - m01*m13*m20 - m03*m10*m21 + m00*m13*m21 + m01*m10*m23 - m00*m11*m23
+    n[3,0] = m12*m21*m30 - m11*m22*m30 - m12*m20*m31 + m10*m22*m31 + m11*m20*m32 - m10*m21*m32
+    n[3,1] = m01*m22*m30 - m02*m21*m30 + m02*m20*m31 - m00*m22*m31 - m01*m20*m32 + m00*m21*m32
+    n[3,2] = m02*m11*m30 - m01*m12*m30 - m02*m10*m31 + m00*m12*m31 + m01*m10*m32 - m00*m11*m32
+    n[3,3] = m01*m12*m20 - m02*m11*m20 + m02*m10*m21 - m00*m12*m21 - m01*m10*m22 + m00*m11*m22
+    n *= 1.0 / d
+
+def _inverse(m, d, out=None):
+    # Pass out to reuse a previously allocated matrix (e.g. a slice of a
+    # batch output array) instead of allocating a fresh one per call:
+    n = out if out is not None else np.empty((4, 4), dtype=np.float64)
+    _inv4_kernel(np.ascontiguousarray(m, dtype=np.float64), d, n)
+    return n
+
+@njit(cache=True, fastmath=True)
+def _inv4_fast_kernel(m):
+    # Laplace expansion via 2x2 minors: the six minors of the top two rows
+    # and the six of the bottom two rows are each used repeatedly by the
+    # adjugate, so computing them once turns every cofactor (and the
+    # determinant) into a three term sum:
+    m00 = m[0,0]; m01 = m[0,1]; m02 = m[0,2]; m03 = m[0,3]
+    m10 = m[1,0]; m11 = m[1,1]; m12 = m[1,2]; m13 = m[1,3]
+    m20 = m[2,0]; m21 = m[2,1]; m22 = m[2,2]; m23 = m[2,3]
+    m30 = m[3,0]; m31 = m[3,1]; m32 = m[3,2]; m33 = m[3,3]
+
+    s0 = m00*m11 - m10*m01
+    s1 = m00*m12 - m10*m02
+    s2 = m00*m13 - m10*m03
+    s3 = m01*m12 - m11*m02
+    s4 = m01*m13 - m11*m03
+    s5 = m02*m13 - m12*m03
+
+    c5 = m22*m33 - m32*m23
+    c4 = m21*m33 - m31*m23
+    c3 = m21*m32 - m31*m22
+    c2 = m20*m33 - m30*m23
+    c1 = m20*m32 - m30*m22
+    c0 = m20*m31 - m30*m21
+
+    det = s0*c5 - s1*c4 + s2*c3 + s3*c2 - s4*c1 + s5*c0
+
+    n = np.empty((4, 4), dtype=np.float64)
+    n[0,0] =  m11*c5 - m12*c4 + m13*c3
+    n[0,1] = -m01*c5 + m02*c4 - m03*c3
+    n[0,2] =  m31*s5 - m32*s4 + m33*s3
+    n[0,3] = -m21*s5 + m22*s4 - m23*s3
+    n[1,0] = -m10*c5 + m12*c2 - m13*c1
+    n[1,1] =  m00*c5 - m02*c2 + m03*c1
+    n[1,2] = -m30*s5 + m32*s2 - m33*s1
+    n[1,3] =  m20*s5 - m22*s2 + m23*s1
+    n[2,0] =  m10*c4 - m11*c2 + m13*c0
+    n[2,1] = -m00*c4 + m01*c2 - m03*c0
+    n[2,2] =  m30*s4 - m31*s2 + m33*s0
+    n[2,3] = -m20*s4 + m21*s2 - m23*s0
+    n[3,0] = -m10*c3 + m11*c1 - m12*c0
+    n[3,1] =  m00*c3 - m01*c1 + m02*c0
+    n[3,2] = -m30*s3 + m31*s1 - m32*s0
+    n[3,3] =  m20*s3 - m21*s1 + m22*s0
+    return n * (1.0 / det)
+
+def _inverse_fast(m):
+    mm = np.ascontiguousarray(m, dtype=np.float64)
+    if not _have_numba and matrix_kernels is not None:
+        n = np.empty((4, 4), dtype=np.float64)
+        matrix_kernels.inv4(mm, n)
+        return n
+    return _inv4_fast_kernel(mm)
 
 def inverse(m):
-    return _inverse(m, determinant(m))
+    return _inverse_fast(m)
+
+def _inverse_euclidean(m, d, out=None):
+    # Simplifying on the assumption that the 4th column is 0,0,0,1.
+    # The nine 2x2 minors of the rotation block are just the three cross
+    # products of its rows, so compute them as such in native numpy code:
+    mm = np.asarray(m, dtype=np.float64)
+    n = out if out is not None else np.empty((4, 4), dtype=np.float64)
+    r0, r1, r2 = mm[0,:3], mm[1,:3], mm[2,:3]
+    n[:3,0] = np.cross(r1, r2)
+    n[:3,1] = np.cross(r2, r0)
+    n[:3,2] = np.cross(r0, r1)
+
+    n[:3,3] = 0
+
+    n[3,:3] = -mm[3,:3] @ n[:3,:3]
+    n[3,3] = r0 @ n[:3,0] # Gut feeling this will always end up as 1
+    # assert(n[3,3] == 1)
 
-def _inverse_euclidean(m, d):
-    # Simplifying on the assumption that the 4th column is 0,0,0,1
-    n = np.matrix([[0.0]*4]*4)
-    n[0,0] = m[1,1]*m[2,2] - m[1,2]*m[2,1]
-    n[1,0] = m[1,2]*m[2,0] - m[1,0]*m[2,2]
-    n[2,0] = m[1,0]*m[2,1] - m[1,1]*m[2,0]
+    # One division + 16 multiplies beats 16 divisions, and matches the
+    # rcp det.x / mul pattern _inverse_euclidean_asm_col_major uses:
+    n *= 1.0 / d
+    return n
 
-    n[0,1] = m[0,2]*m[2,1] - m[0,1]*m[2,2]
-    n[1,1] = m[0,0]*m[2,2] - m[0,2]*m[2,0]
-    n[2,1] = m[0,1]*m[2,0] - m[0,0]*m[2,1]
+def inverse_euclidean(m):
+    if not _have_numba and matrix_kernels is not None:
+        n = np.empty((4, 4), dtype=np.float64)
+        matrix_kernels.inv4_euclidean(np.ascontiguousarray(m, dtype=np.float64), n)
+        return n
+    return _inverse_euclidean(m, determinant_euclidean(m))
 
-    n[0,2] = m[0,1]*m[1,2] - m[0,2]*m[1,1]
-    n[1,2] = m[0,2]*m[1,0] - m[0,0]*m[1,2]
-    n[2,2] = m[0,0]*m[1,1] - m[0,1]*m[1,0]
+@njit(cache=True, fastmath=True)
+def _inv_euclid_kernel(m, n):
+    # Scalar version of _inverse_euclidean that computes the determinant
+    # itself and writes the result into a caller provided matrix, suitable
+    # for calling from other jitted code:
+    m00 = m[0,0]; m01 = m[0,1]; m02 = m[0,2]
+    m10 = m[1,0]; m11 = m[1,1]; m12 = m[1,2]
+    m20 = m[2,0]; m21 = m[2,1]; m22 = m[2,2]
+    m30 = m[3,0]; m31 = m[3,1]; m32 = m[3,2]
+
+    n00 = m11*m22 - m12*m21
+    n10 = m12*m20 - m10*m22
+    n20 = m10*m21 - m11*m20
+
+    n01 = m02*m21 - m01*m22
+    n11 = m00*m22 - m02*m20
+    n21 = m01*m20 - m00*m21
+
+    n02 = m01*m12 - m02*m11
+    n12 = m02*m10 - m00*m12
+    n22 = m00*m11 - m01*m10
+
+    inv_d = 1.0 / (m00*n00 + m01*n10 + m02*n20)
+
+    n[0,0] = n00 * inv_d
+    n[1,0] = n10 * inv_d
+    n[2,0] = n20 * inv_d
+    n[0,1] = n01 * inv_d
+    n[1,1] = n11 * inv_d
+    n[2,1] = n21 * inv_d
+    n[0,2] = n02 * inv_d
+    n[1,2] = n12 * inv_d
+    n[2,2] = n22 * inv_d
 
     n[0,3] = n[1,3] = n[2,3] = 0
+    n[3,0] = -(m30*n00 + m31*n10 + m32*n20) * inv_d
+    n[3,1] = -(m30*n01 + m31*n11 + m32*n21) * inv_d
+    n[3,2] = -(m30*n02 + m31*n12 + m32*n22) * inv_d
+    n[3,3] = 1
 
-    n[3,0] = - m[3,0]*n[0,0] - m[3,1]*n[1,0] - m[3,2]*n[2,0]
-    n[3,1] = - m[3,0]*n[0,1] - m[3,1]*n[1,1] - m[3,2]*n[2,1]
-    n[3,2] = - m[3,0]*n[0,2] - m[3,1]*n[1,2] - m[3,2]*n[2,2]
-    n[3,3] =   m[0,0]*n[0,0] + m[0,1]*n[1,0] + m[0,2]*n[2,0] # Gut feeling this will always end up as 1
-    # assert(n[3,3] == 1)
-
-    return n / d
+@njit(parallel=True, fastmath=True, cache=True)
+def _inverse_euclidean_batch(M, out):
+    for k in prange(M.shape[0]):
+        _inv_euclid_kernel(M[k], out[k])
 
-def inverse_euclidean(m):
-    return _inverse_euclidean(m, determinant_euclidean(m))
+def inverse_euclidean_batch(M, out=None):
+    '''
+    Inverts a whole (N, 4, 4) array of euclidean matrices at once. Each
+    inversion is independent, so with numba available the batch is spread
+    across all cores. Pass out to write into a previously allocated array.
+    '''
+    M = np.ascontiguousarray(M, dtype=np.float64)
+    if out is None:
+        out = np.empty_like(M)
+    _inverse_euclidean_batch(M, out)
+    return out
 
 def _inverse_euclidean_asm_col_major(col0, col1, col2, det):
     '''
@@ -342,7 +620,7 @@ def _inverse_euclidean_asm_col_major(col0, col1, col2, det):
     return (dst0, dst1, dst2, dst3)
 
 def inverse_euclidean_asm_col_major(m):
-    (col0, col1, col2, _) = col_major_regs(m)
+    (col0, col1, col2, _) = _col_major_regs(m)
     det = _determinant_euclidean_asm_col_major(col0, col1, col2)
     return _inverse_euclidean_asm_col_major(col0, col1, col2, det)
 
@@ -363,19 +641,24 @@ def mv_mvp_m00i(mv, mvp):
     #    assumption that the 4th column is 0,0,0,1:
     d = determinant_euclidean(mv)
 
-    # 2. Calculate the 1st row of the inverted model-view matrix:
-    mvi = inverse_matrix_euclidean_m0(mv, d)
+    # 2. Calculate the 1st row of the adjugate (inverse before dividing by the
+    #    determinant) of the model-view matrix:
+    m00 = mv[1,1]*mv[2,2] - mv[1,2]*mv[2,1]
+    m01 = mv[0,2]*mv[2,1] - mv[0,1]*mv[2,2]
+    m02 = mv[0,1]*mv[1,2] - mv[0,2]*mv[1,1]
 
-    # 3. Multiply the 1st row of the inverted model-view matrix with the 1st
-    #    column of the model-view-projection matrix:
-    p00 = (mvi[0] * mvp[0,0] + \
-           mvi[1] * mvp[1,0] + \
-           mvi[2] * mvp[2,0])
+    # 3. Multiply that row with the 1st column of the model-view-projection
+    #    matrix. p00 would be this divided by the determinant, but since the
+    #    result we want is 1/p00 the divisions cancel against the final
+    #    reciprocal, leaving a single division overall:
+    num = m00 * mvp[0,0] + \
+          m01 * mvp[1,0] + \
+          m02 * mvp[2,0]
 
     # 4. Calculate the top-left cell of the inverse projection matrix, which
     #    thanks to the structure of a projection matrix (even an off-center
     #    one) turns out to simplify down to:
-    return 1 / p00
+    return d / num
 
 # So, the assembly should be something like this, which will save us using up
 # one of the two matrix copy slots in Helix mod where we only need to invert a
@@ -431,31 +714,77 @@ def mv_mvp_m00i(mv, mvp):
 # //    matrix (should even work for off-center projection matrices):
 # rcp r20.x, r20.x
 
-def random_euclidean_matrix(multiplier=1):
-    '''
-    Generates a matrix with random euclidean transformations applied to it in a
-    random order. Useful for testing simplified matrix algorithms that are
-    supposed to work on matrices that do not use the homogeneous 4th
-    coordinate but have no other assumptions (e.g. model-view, but not
-    model-view-projection).
-    '''
+def _compose_rotation(r, core):
+    # Accumulate a rotation primitive (as one of the _rotate_*_core tuples)
+    # into the pending composed 3x3 rotation:
+    r_axis = np.array(core, dtype=np.float64).reshape(4, 4)[:3,:3]
+    if r is None:
+        return r_axis
+    return r @ r_axis
+
+def _flush_rotation(m, r):
+    # Apply a pending composed rotation. Only the top-left 3x3 of the
+    # embedded 4x4 is non-trivial, so only columns 0-2 of m change:
+    if r is not None:
+        m[:,:3] = m[:,:3] @ r
+
+def _random_euclidean_steps(m, multiplier, verbose):
     import random
-    m = np.identity(4)
+    # Runs of consecutive rotations are composed into a single pending 3x3
+    # first, so k rotations in a row cost k small 3x3 multiplies and one
+    # pass over m instead of k:
+    r = None
     steps = random.randint(1,10)
     for i in range(steps):
         choice = random.randrange(5)
+        if choice < 2:
+            _flush_rotation(m, r)
+            r = None
         if choice == 0:
-            m = m * translate(random.random() * multiplier, random.random() * multiplier, random.random() * multiplier, verbose=True)
+            _apply_translate_right(m, random.random() * multiplier, random.random() * multiplier, random.random() * multiplier, verbose=verbose)
         if choice == 1:
-            m = m * scale(random.random() * multiplier, random.random() * multiplier, random.random() * multiplier, verbose=True)
+            _apply_scale_right(m, random.random() * multiplier, random.random() * multiplier, random.random() * multiplier, verbose=verbose)
         if choice == 2:
-            m = m * rotate_x(random.random() * 180, verbose=True)
+            angle = random.random() * 180
+            if verbose:
+                print(''' ROTATE X:  %-8f   %8s   %8s  ''' % (angle, '', ''))
+            r = _compose_rotation(r, _rotate_x_core(angle))
         if choice == 3:
-            m = m * rotate_y(random.random() * 180, verbose=True)
+            angle = random.random() * 180
+            if verbose:
+                print(''' ROTATE Y:  %8s   %-8f   %8s  ''' % ('', angle, ''))
+            r = _compose_rotation(r, _rotate_y_core(angle))
         if choice == 4:
-            m = m * rotate_z(random.random() * 180, verbose=True)
+            angle = random.random() * 180
+            if verbose:
+                print(''' ROTATE Z:  %8s   %8s   %-8f  ''' % ('', '', angle))
+            r = _compose_rotation(r, _rotate_z_core(angle))
+    _flush_rotation(m, r)
+
+def random_euclidean_matrix(multiplier=1):
+    '''
+    Generates a matrix with random euclidean transformations applied to it in a
+    random order. Useful for testing simplified matrix algorithms that are
+    supposed to work on matrices that do not use the homogeneous 4th
+    coordinate but have no other assumptions (e.g. model-view, but not
+    model-view-projection).
+    '''
+    m = np.identity(4, dtype=np.float64)
+    _random_euclidean_steps(m, multiplier, True)
     return m
 
+def random_euclidean_matrices(n, multiplier=1, verbose=False):
+    '''
+    Generates an (n, 4, 4) contiguous array of random euclidean matrices.
+    One slab rather than a list of separate 4x4 objects, so downstream bulk
+    processing (inverse_euclidean_batch, batched @ against MVPs) works over
+    cache friendly contiguous memory in a single call.
+    '''
+    out = np.broadcast_to(np.identity(4, dtype=np.float64), (n, 4, 4)).copy()
+    for k in range(n):
+        _random_euclidean_steps(out[k], multiplier, verbose)
+    return out
+
 def random_projection_matrix():
     import random
     near = random.random() * 10 + 1e-45 # Near cannot be 0, so add the minimum non-zero value a 32bit float can hold
@@ -467,4 +796,4 @@ def random_projection_matrix():
 def random_mvp():
     mv = random_euclidean_matrix()
     p = random_projection_matrix()
-    return mv * p
+    return mv @ p
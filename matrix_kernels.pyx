@@ -0,0 +1,105 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+'''
+Compiled fallbacks for the closed-form 4x4 kernels in matrix.py, used when
+numba is not available. Build in place with:
+
+    python setup.py build_ext --inplace
+'''
+
+cpdef double det4(double[:, ::1] m):
+    cdef double m00 = m[0,0], m01 = m[0,1], m02 = m[0,2], m03 = m[0,3]
+    cdef double m10 = m[1,0], m11 = m[1,1], m12 = m[1,2], m13 = m[1,3]
+    cdef double m20 = m[2,0], m21 = m[2,1], m22 = m[2,2], m23 = m[2,3]
+    cdef double m30 = m[3,0], m31 = m[3,1], m32 = m[3,2], m33 = m[3,3]
+    return \
+    m03*m12*m21*m30 - m02*m13*m21*m30 - m03*m11*m22*m30 + m01*m13*m22*m30 + \
+    m02*m11*m23*m30 - m01*m12*m23*m30 - m03*m12*m20*m31 + m02*m13*m20*m31 + \
+    m03*m10*m22*m31 - m00*m13*m22*m31 - m02*m10*m23*m31 + m00*m12*m23*m31 + \
+    m03*m11*m20*m32 - m01*m13*m20*m32 - m03*m10*m21*m32 + m00*m13*m21*m32 + \
+    m01*m10*m23*m32 - m00*m11*m23*m32 - m02*m11*m20*m33 + m01*m12*m20*m33 + \
+    m02*m10*m21*m33 - m00*m12*m21*m33 - m01*m10*m22*m33 + m00*m11*m22*m33
+
+cpdef void inv4(double[:, ::1] m, double[:, ::1] n):
+    # Laplace expansion via 2x2 minors, mirroring _inv4_fast_kernel:
+    cdef double m00 = m[0,0], m01 = m[0,1], m02 = m[0,2], m03 = m[0,3]
+    cdef double m10 = m[1,0], m11 = m[1,1], m12 = m[1,2], m13 = m[1,3]
+    cdef double m20 = m[2,0], m21 = m[2,1], m22 = m[2,2], m23 = m[2,3]
+    cdef double m30 = m[3,0], m31 = m[3,1], m32 = m[3,2], m33 = m[3,3]
+
+    cdef double s0 = m00*m11 - m10*m01
+    cdef double s1 = m00*m12 - m10*m02
+    cdef double s2 = m00*m13 - m10*m03
+    cdef double s3 = m01*m12 - m11*m02
+    cdef double s4 = m01*m13 - m11*m03
+    cdef double s5 = m02*m13 - m12*m03
+
+    cdef double c5 = m22*m33 - m32*m23
+    cdef double c4 = m21*m33 - m31*m23
+    cdef double c3 = m21*m32 - m31*m22
+    cdef double c2 = m20*m33 - m30*m23
+    cdef double c1 = m20*m32 - m30*m22
+    cdef double c0 = m20*m31 - m30*m21
+
+    cdef double inv_d = 1.0 / (s0*c5 - s1*c4 + s2*c3 + s3*c2 - s4*c1 + s5*c0)
+
+    n[0,0] = ( m11*c5 - m12*c4 + m13*c3) * inv_d
+    n[0,1] = (-m01*c5 + m02*c4 - m03*c3) * inv_d
+    n[0,2] = ( m31*s5 - m32*s4 + m33*s3) * inv_d
+    n[0,3] = (-m21*s5 + m22*s4 - m23*s3) * inv_d
+    n[1,0] = (-m10*c5 + m12*c2 - m13*c1) * inv_d
+    n[1,1] = ( m00*c5 - m02*c2 + m03*c1) * inv_d
+    n[1,2] = (-m30*s5 + m32*s2 - m33*s1) * inv_d
+    n[1,3] = ( m20*s5 - m22*s2 + m23*s1) * inv_d
+    n[2,0] = ( m10*c4 - m11*c2 + m13*c0) * inv_d
+    n[2,1] = (-m00*c4 + m01*c2 - m03*c0) * inv_d
+    n[2,2] = ( m30*s4 - m31*s2 + m33*s0) * inv_d
+    n[2,3] = (-m20*s4 + m21*s2 - m23*s0) * inv_d
+    n[3,0] = (-m10*c3 + m11*c1 - m12*c0) * inv_d
+    n[3,1] = ( m00*c3 - m01*c1 + m02*c0) * inv_d
+    n[3,2] = (-m30*s3 + m31*s1 - m32*s0) * inv_d
+    n[3,3] = ( m20*s3 - m21*s1 + m22*s0) * inv_d
+
+cpdef double det3_euclidean(double[:, ::1] m):
+    # Simple case assuming m[0,3] = 0, m[1,3] = 0, m[2,3] = 0, m[3,3] = 1:
+    return m[0,0]*(m[1,1]*m[2,2] - m[1,2]*m[2,1]) \
+         + m[0,1]*(m[1,2]*m[2,0] - m[1,0]*m[2,2]) \
+         + m[0,2]*(m[1,0]*m[2,1] - m[1,1]*m[2,0])
+
+cpdef void inv4_euclidean(double[:, ::1] m, double[:, ::1] n):
+    # Scalar euclidean inverse, mirroring _inv_euclid_kernel:
+    cdef double m00 = m[0,0], m01 = m[0,1], m02 = m[0,2]
+    cdef double m10 = m[1,0], m11 = m[1,1], m12 = m[1,2]
+    cdef double m20 = m[2,0], m21 = m[2,1], m22 = m[2,2]
+    cdef double m30 = m[3,0], m31 = m[3,1], m32 = m[3,2]
+
+    cdef double n00 = m11*m22 - m12*m21
+    cdef double n10 = m12*m20 - m10*m22
+    cdef double n20 = m10*m21 - m11*m20
+
+    cdef double n01 = m02*m21 - m01*m22
+    cdef double n11 = m00*m22 - m02*m20
+    cdef double n21 = m01*m20 - m00*m21
+
+    cdef double n02 = m01*m12 - m02*m11
+    cdef double n12 = m02*m10 - m00*m12
+    cdef double n22 = m00*m11 - m01*m10
+
+    cdef double inv_d = 1.0 / (m00*n00 + m01*n10 + m02*n20)
+
+    n[0,0] = n00 * inv_d
+    n[1,0] = n10 * inv_d
+    n[2,0] = n20 * inv_d
+    n[0,1] = n01 * inv_d
+    n[1,1] = n11 * inv_d
+    n[2,1] = n21 * inv_d
+    n[0,2] = n02 * inv_d
+    n[1,2] = n12 * inv_d
+    n[2,2] = n22 * inv_d
+
+    n[0,3] = 0
+    n[1,3] = 0
+    n[2,3] = 0
+    n[3,0] = -(m30*n00 + m31*n10 + m32*n20) * inv_d
+    n[3,1] = -(m30*n01 + m31*n11 + m32*n21) * inv_d
+    n[3,2] = -(m30*n02 + m31*n12 + m32*n22) * inv_d
+    n[3,3] = 1
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+
+# Only builds the optional compiled kernels for matrix.py - nothing else in
+# this repository needs building. Usage:
+#
+#   python setup.py build_ext --inplace
+
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name='matrix_kernels',
+    ext_modules=cythonize('matrix_kernels.pyx'),
+)